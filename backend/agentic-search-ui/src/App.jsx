@@ -72,7 +72,7 @@ export default function App() {
     setData(null);
 
     try {
-      const res = await fetch(`${API_BASE}/search`, {
+      const res = await fetch(`${API_BASE}/search?stream=false`, {
         method: "POST",
         headers: { "Content-Type": "application/json" },
         body: JSON.stringify({ query, k }),
@@ -1,13 +1,34 @@
 import os
-import textwrap
+from concurrent.futures import ThreadPoolExecutor
+from typing import Final
+
 import requests
 from dotenv import load_dotenv
-from googleapiclient.discovery import build
 from bs4 import BeautifulSoup
+from requests.adapters import HTTPAdapter
 
 # --- LLM: Anthropic (Claude) ---
 import anthropic
 
+# --- Query-aware excerpt trimming + shared page-text helpers ---
+from compress import compress_excerpt
+from pages import (
+    MAX_HTML_BYTES,
+    TEXT_STRAINER,
+    check_content_length,
+    decode_html,
+    normalize_whitespace,
+)
+
+# --- Forced answer tool shared with the API server ---
+from answer_tool import ANSWER_TOOL, ANSWER_TOOL_CHOICE, answer_from_message
+
+# --- On-disk answer/page cache ---
+import llm_cache
+
+# --- Backoff policies for Google / Claude / page fetches ---
+from retries import HTTP_TIMEOUT, claude_retry, http_retry
+
 # -----------------------------
 # Env + clients
 # -----------------------------
@@ -22,85 +43,156 @@ if not ANTHROPIC_API_KEY:
 if not (GSEARCH_API_KEY and SEARCH_ENGINE_ID):
     raise RuntimeError("Google search keys missing in .env (GSEARCH_API_KEY, SEARCH_ENGINE_ID)")
 
-claude = anthropic.Anthropic(api_key=ANTHROPIC_API_KEY)
+# Retries are handled by retries.claude_retry (with jitter), not the SDK
+claude = anthropic.Anthropic(api_key=ANTHROPIC_API_KEY, max_retries=0)
+
+# Haiku is plenty for a guided, cited summary; set CLAUDE_MODEL for Sonnet
+CLAUDE_MODEL = os.getenv("CLAUDE_MODEL", "claude-3-5-haiku-latest")
+
+# Shared keep-alive session so repeat hosts skip the TCP+TLS handshake
+_ADAPTER = HTTPAdapter(
+    pool_connections=16,
+    pool_maxsize=32,
+    max_retries=http_retry(),
+)
+SESSION = requests.Session()
+SESSION.mount("http://", _ADAPTER)
+SESSION.mount("https://", _ADAPTER)
+SESSION.headers.update({
+    "User-Agent": (
+        "Mozilla/5.0 (Windows NT 10.0; Win64; x64) "
+        "AppleWebKit/537.36 (KHTML, like Gecko) "
+        "Chrome/120.0.0.0 Safari/537.36"
+    )
+})
 
 # -----------------------------
 # Web search + fetch
 # -----------------------------
+CSE_URL = "https://www.googleapis.com/customsearch/v1"
+
 def google_search(query: str, num_results: int = 5):
-    """Use Google Custom Search API to get top results."""
-    service = build("customsearch", "v1", developerKey=GSEARCH_API_KEY)
-    res = service.cse().list(q=query, cx=SEARCH_ENGINE_ID, num=num_results).execute()
-    return res.get("items", [])
+    """Use Google Custom Search API to get top results (transient failures retried by SESSION)."""
+    resp = SESSION.get(CSE_URL, params={
+        "key": GSEARCH_API_KEY,
+        "cx": SEARCH_ENGINE_ID,
+        "q": query,
+        "num": num_results,
+    }, timeout=HTTP_TIMEOUT)
+    resp.raise_for_status()
+    return resp.json().get("items", [])
+
+def fetch_html(url: str) -> str:
+    """Download at most MAX_HTML_BYTES of (decompressed) HTML."""
+    with SESSION.get(url, timeout=HTTP_TIMEOUT, stream=True) as r:
+        r.raise_for_status()
+        check_content_length(r.headers)
+
+        # iter_content decompresses as it reads, so a gzip bomb stops near the cap; each
+        # network chunk is inflated whole first, so one read can still overshoot it
+        r.raw.decode_content = True
+        buf = bytearray()
+        for chunk in r.iter_content(chunk_size=16_384):
+            buf.extend(chunk)
+            if len(buf) >= MAX_HTML_BYTES:
+                break
+        return decode_html(buf, r.encoding)
 
 def fetch_text(url: str, max_chars: int = 20_000) -> str:
     """Fetch page and return readable text (trimmed)."""
+    # Keyed by extractor and length: the server shares this cache file but extracts differently
+    cache_key = llm_cache.make_key("page:cli", url, str(max_chars))
+    cached = llm_cache.get(cache_key)
+    if cached is not None:
+        return cached
+
     try:
-        html = requests.get(url, timeout=12).text
-        soup = BeautifulSoup(html, "html.parser")
+        html = fetch_html(url)
+        soup = BeautifulSoup(html, "lxml", parse_only=TEXT_STRAINER)
 
-        # Remove script/style
+        # Remove script/style left inside kept containers
         for tag in soup(["script", "style", "noscript"]):
             tag.decompose()
 
-        text = soup.get_text(separator="\n")
         # Normalize whitespace
-        text = "\n".join(line.strip() for line in text.splitlines() if line.strip())
-        return text[:max_chars]
+        text = normalize_whitespace(soup.get_text("\n"))[:max_chars]
     except Exception as e:
         return f"[Fetch error for {url}: {e}]"
 
+    llm_cache.set(cache_key, text, llm_cache.CONFIG.page_ttl)
+    return text
+
 # -----------------------------
 # LLM call (Claude)
 # -----------------------------
+# Static, so it is built once. No cache_control marker: the tools + system prefix is far
+# below Claude's minimum cacheable length, and the sources differ per query
+SYSTEM_PROMPT: Final[list[dict]] = [{
+    "type": "text",
+    "text": (
+        "You are a careful research assistant. "
+        "Answer the user query using only the information from the provided sources when possible. "
+        "Cite sources inline like [1], [2] where you use them. If something isn't supported by the sources, say so."
+    ),
+}]
+
+@claude_retry
+def create_message(**kwargs):
+    return claude.messages.create(**kwargs)
+
 def summarize_with_claude(sources: list[dict], user_query: str) -> str:
     """
     sources: list of { 'title': str, 'link': str, 'content': str }
     user_query: the question to answer
     """
     # Build a compact, cited context Claude can work with
-    # Keep it lean to avoid token waste; Claude 3.5 Sonnet has a large context window, but trimming is good practice.
+    # Keep it lean to avoid token waste: each excerpt keeps only the ~1000 tokens most relevant to the query.
     context_blocks = []
     for i, s in enumerate(sources, start=1):
-        block = textwrap.dedent(f"""
-        [Source {i}]
-        Title: {s.get('title') or 'Untitled'}
-        URL: {s.get('link')}
-        Excerpt:
-        {s.get('content', '')[:4000]}
-        """).strip()
+        excerpt = compress_excerpt(s.get('content', ''), user_query, token_budget=1000)
+        block = (
+            f"[Source {i}]\n"
+            f"Title: {s.get('title') or 'Untitled'}\n"
+            f"URL: {s.get('link')}\n"
+            f"Excerpt:\n{excerpt}"
+        )
         context_blocks.append(block)
 
     context = "\n\n".join(context_blocks)
 
-    system_prompt = (
-        "You are a careful research assistant. "
-        "Answer the user query using only the information from the provided sources when possible. "
-        "Cite sources inline like [1], [2] where you use them. If something isn't supported by the sources, say so."
+    sources_prompt = (
+        "Here are web sources. Use them to produce a concise, well-structured answer with citations:\n\n"
+        f"{context}"
     )
 
-    user_prompt = textwrap.dedent(f"""
-    user_query: {user_query}
+    model = CLAUDE_MODEL
+    cache_key = llm_cache.make_key(model, SYSTEM_PROMPT[0]["text"], sources_prompt, user_query)
+    cached = llm_cache.get(cache_key)
+    if cached is not None:
+        return cached
 
-    Here are web sources. Use them to produce a concise, well-structured answer with citations:
-
-    {context}
-    """).strip()
-
-    msg = claude.messages.create(
-        model="claude-3-5-sonnet-latest",   # or "claude-3-5-haiku-latest" for cheaper/faster
+    # Static system prompt first, then the per-query sources, then the short query
+    msg = create_message(
+        model=model,
         max_tokens=1200,
         temperature=0.2,
-        system=system_prompt,
-        messages=[{"role": "user", "content": user_prompt}],
+        system=SYSTEM_PROMPT,
+        messages=[{
+            "role": "user",
+            "content": [
+                {"type": "text", "text": sources_prompt},
+                {"type": "text", "text": f"user_query: {user_query}"},
+            ],
+        }],
+        tools=[ANSWER_TOOL],
+        tool_choice=ANSWER_TOOL_CHOICE,
     )
 
-    # Anthropic returns a list of content blocks; join text parts
-    parts = []
-    for p in msg.content:
-        if p.type == "text":
-            parts.append(p.text)
-    return "".join(parts)
+    # Raises on a truncated/empty answer, so only complete answers are cached
+    answer = answer_from_message(msg)
+
+    llm_cache.set(cache_key, answer, llm_cache.CONFIG.llm_ttl)
+    return answer
 
 # -----------------------------
 # Agent pipeline
@@ -111,13 +203,18 @@ def agentic_search(query: str, k: int = 5) -> str:
     if not results:
         return "No search results returned. Check your Google CSE settings (entire web, API enabled)."
 
-    sources = []
-    for r in results:
-        link = r.get("link")
-        title = r.get("title")
+    pairs = [(r.get("title"), r.get("link")) for r in results]
+    for title, link in pairs:
         print(f"📎 Fetching: {title} — {link}")
-        content = fetch_text(link)
-        sources.append({"title": title, "link": link, "content": content})
+
+    # Fetches are I/O-bound and independent, so run them side by side
+    with ThreadPoolExecutor(max_workers=min(16, len(pairs))) as ex:
+        contents = list(ex.map(fetch_text, [link for _, link in pairs]))
+
+    sources = [
+        {"title": title, "link": link, "content": content}
+        for (title, link), content in zip(pairs, contents)
+    ]
 
     print("🤖 Asking Claude...")
     return summarize_with_claude(sources, query)
@@ -0,0 +1,45 @@
+# answer_tool.py
+"""
+Forced `answer` tool shared by the API server and the CLI.
+"""
+from typing import Final
+
+# Forced tool call so Claude returns {answer, citations} with no prose wrapper
+ANSWER_TOOL: Final[dict] = {
+    "name": "answer",
+    "description": "Return the final answer to the user query.",
+    "input_schema": {
+        "type": "object",
+        "properties": {
+            "answer": {"type": "string", "description": "Answer with inline citations like [1], [2]."},
+            "citations": {"type": "array", "items": {"type": "integer"}, "description": "Source numbers used."},
+        },
+        "required": ["answer"],
+    },
+}
+
+ANSWER_TOOL_CHOICE: Final[dict] = {"type": "tool", "name": "answer"}
+
+
+class IncompleteAnswerError(RuntimeError):
+    """
+    Claude stopped without a usable answer (cut off at max_tokens, refused, or empty).
+    """
+
+
+def answer_from_message(msg) -> str:
+    """
+    Return the answer from a forced `answer` tool call. Raises IncompleteAnswerError
+    instead of returning "", so callers never cache a truncated or empty answer.
+    """
+    if msg.stop_reason != "tool_use":
+        raise IncompleteAnswerError(f"Claude stopped early (stop_reason={msg.stop_reason})")
+
+    # The forced tool call carries the answer; no text blocks to join
+    answer = next(
+        (p.input.get("answer") or "" for p in msg.content if getattr(p, "type", "") == "tool_use"),
+        "",
+    ).strip()
+    if not answer:
+        raise IncompleteAnswerError("Claude returned an empty answer")
+    return answer
@@ -0,0 +1,64 @@
+# compress.py
+"""
+Query-aware excerpt compression.
+
+Instead of sending Claude the first N characters of each page, keep the sentences
+that score highest against the query (TF-IDF cosine) until a token budget is hit,
+then restore their original order so the excerpt still reads naturally.
+"""
+import re
+
+from sklearn.feature_extraction.text import TfidfVectorizer
+from sklearn.metrics.pairwise import linear_kernel
+
+# Rough token estimate used for budgeting
+CHARS_PER_TOKEN = 4
+
+# Sentence ends, plus line breaks (headings/list items rarely end in punctuation).
+# Captured so the output can keep a line break wherever the page had one.
+_SENTENCE_SPLIT = re.compile(r"((?<=[.!?])\s+|\n+)")
+
+
+def compress_excerpt(content: str, query: str, token_budget: int = 1500) -> str:
+    """
+    Return the sentences of `content` most relevant to `query`, within `token_budget`.
+    Short content is returned unchanged.
+    """
+    budget_chars = token_budget * CHARS_PER_TOKEN
+    if len(content) <= budget_chars:
+        return content
+
+    parts = _SENTENCE_SPLIT.split(content)
+    sentences, line_ends = [], []  # line_ends[i]: a line break follows sentences[i]
+    for piece, sep in zip(parts[::2], parts[1::2] + [""]):
+        if piece.strip():
+            sentences.append(piece.strip())
+            line_ends.append("\n" in sep)
+        elif line_ends and "\n" in sep:
+            line_ends[-1] = True
+    try:
+        tfidf = TfidfVectorizer(stop_words="english").fit_transform(sentences + [query])
+        # Rows are L2-normalized, so the linear kernel is cosine similarity
+        scores = linear_kernel(tfidf[:-1], tfidf[-1]).ravel()
+    except ValueError:  # nothing but stop words: keep page order
+        scores = [0.0] * len(sentences)
+
+    ranked = sorted(range(len(sentences)), key=lambda i: (-scores[i], i))
+
+    keep, used = [], 0
+    for i in ranked:
+        cost = len(sentences[i]) + 1
+        if used + cost > budget_chars:
+            continue  # skip rather than cut mid-sentence
+        keep.append(i)
+        used += cost
+
+    if not keep:  # every sentence is over budget on its own
+        return content[:budget_chars]
+    # Headings and list items stay on their own lines instead of running together
+    keep.sort()
+    out = [sentences[keep[0]]]
+    for prev, i in zip(keep, keep[1:]):
+        out.append("\n" if any(line_ends[prev:i]) else " ")
+        out.append(sentences[i])
+    return "".join(out)
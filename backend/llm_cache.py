@@ -0,0 +1,126 @@
+# llm_cache.py
+"""
+Small on-disk TTL cache backed by SQLite.
+
+Used for two tiers:
+  - prompt hash -> Claude answer
+  - url hash    -> extracted page text
+"""
+import hashlib
+import itertools
+import os
+import sqlite3
+import threading
+import time
+from dataclasses import dataclass
+from typing import Optional
+
+
+# =========================
+# Config
+# =========================
+def _env_bool(name: str, default: bool) -> bool:
+    val = os.getenv(name)
+    if val is None:
+        return default
+    return val.strip().lower() in ("1", "true", "yes", "on")
+
+
+@dataclass(frozen=True)
+class CacheConfig:
+    llm_cache_enabled: bool = True
+    llm_cache_ttl_days: int = 7
+    page_cache_ttl_hours: int = 24
+    path: str = os.path.join(os.path.dirname(os.path.abspath(__file__)), ".cache", "llm_cache.db")
+
+    @property
+    def llm_ttl(self) -> float:
+        return self.llm_cache_ttl_days * 86_400
+
+    @property
+    def page_ttl(self) -> float:
+        return self.page_cache_ttl_hours * 3_600
+
+
+CONFIG = CacheConfig(
+    llm_cache_enabled=_env_bool("LLM_CACHE_ENABLED", True),
+    llm_cache_ttl_days=int(os.getenv("LLM_CACHE_TTL_DAYS", "7")),
+    page_cache_ttl_hours=int(os.getenv("PAGE_CACHE_TTL_HOURS", "24")),
+    path=os.getenv("LLM_CACHE_PATH") or CacheConfig.path,
+)
+
+
+# =========================
+# Storage
+# =========================
+# sqlite3 connections can't be shared across threads, and fetches run in a pool
+_local = threading.local()
+
+# Expired rows are swept when a connection opens and then every PURGE_EVERY writes
+PURGE_EVERY = 200
+_writes = itertools.count(1)
+
+
+def _purge_expired(conn: sqlite3.Connection) -> None:
+    with conn:
+        conn.execute("DELETE FROM cache WHERE expires_at <= ?", (time.time(),))
+
+
+def _conn() -> sqlite3.Connection:
+    conn = getattr(_local, "conn", None)
+    if conn is None:
+        os.makedirs(os.path.dirname(CONFIG.path), exist_ok=True)
+        conn = sqlite3.connect(CONFIG.path, timeout=5)
+        conn.execute("PRAGMA journal_mode=WAL")
+        conn.execute("PRAGMA synchronous=NORMAL")
+        conn.execute(
+            "CREATE TABLE IF NOT EXISTS cache ("
+            " key TEXT PRIMARY KEY,"
+            " value TEXT NOT NULL,"
+            " expires_at REAL NOT NULL)"
+        )
+        conn.execute("CREATE INDEX IF NOT EXISTS cache_expires_at ON cache (expires_at)")
+        _purge_expired(conn)
+        _local.conn = conn
+    return conn
+
+
+def make_key(*parts: str) -> str:
+    """
+    SHA-256 over the given parts (NUL-separated so ("ab", "c") != ("a", "bc")).
+    """
+    return hashlib.sha256("\0".join(parts).encode("utf-8")).hexdigest()
+
+
+def get(key: str) -> Optional[str]:
+    """
+    Return the cached value, or None on miss/expiry/disabled cache.
+    """
+    if not CONFIG.llm_cache_enabled:
+        return None
+    try:
+        row = _conn().execute(
+            "SELECT value FROM cache WHERE key = ? AND expires_at > ?", (key, time.time())
+        ).fetchone()
+    except sqlite3.Error:
+        return None
+    return row[0] if row else None
+
+
+def set(key: str, val: str, ttl: float) -> None:
+    """
+    Store `val` under `key` for `ttl` seconds. Cache errors never break the caller.
+    """
+    if not CONFIG.llm_cache_enabled:
+        return
+    try:
+        conn = _conn()
+        with conn:
+            conn.execute(
+                "INSERT OR REPLACE INTO cache (key, value, expires_at) VALUES (?, ?, ?)",
+                (key, val, time.time() + ttl),
+            )
+        if next(_writes) % PURGE_EVERY == 0:
+            _purge_expired(conn)
+    except sqlite3.Error:
+        pass
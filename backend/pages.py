@@ -0,0 +1,50 @@
+# pages.py
+"""
+Page-text helpers shared by the API server and the CLI.
+"""
+import re
+
+from bs4 import SoupStrainer
+
+# Only build the parts of the DOM that carry readable text
+TEXT_STRAINER = SoupStrainer(["p", "h1", "h2", "h3", "h4", "li", "article", "main", "section"])
+
+# Any line boundary str.splitlines() recognises (\r, \v, \f, \x85, \u2028, ...)
+_BREAK = r"\n\r\v\f\x1c-\x1e\x85\u2028\u2029"
+
+# Trailing space + a line break + every following whitespace char (incl. &nbsp;-only
+# lines): strips lines and drops blank ones in one C-level sweep
+_WS = re.compile(rf"[^\S{_BREAK}]*[{_BREAK}]\s*")
+_RUNS = re.compile(r"[^\S\n]{2,}")
+
+
+def normalize_whitespace(raw: str) -> str:
+    """
+    Drop blank lines, strip each line, and squeeze runs of spaces/tabs.
+    """
+    return _RUNS.sub(" ", _WS.sub("\n", raw).strip())
+
+
+# Memory bound per fetch: refuse huge declared bodies, truncate the rest after decompression
+MAX_CONTENT_LENGTH = 5_000_000
+MAX_HTML_BYTES = 2_000_000
+
+
+def check_content_length(headers) -> None:
+    """
+    Raise ValueError if the declared body size is over MAX_CONTENT_LENGTH.
+    """
+    declared = int(headers.get("content-length") or 0)
+    if declared > MAX_CONTENT_LENGTH:
+        raise ValueError(f"response too large ({declared} bytes)")
+
+
+def decode_html(buf: bytearray, encoding) -> str:
+    """
+    Decode at most MAX_HTML_BYTES; a multi-byte char cut at the cap becomes U+FFFD.
+    An unknown or misspelled charset falls back to UTF-8 instead of failing the fetch.
+    """
+    try:
+        return buf[:MAX_HTML_BYTES].decode(encoding or "utf-8", errors="replace")
+    except LookupError:
+        return buf[:MAX_HTML_BYTES].decode("utf-8", errors="replace")
@@ -0,0 +1,68 @@
+# retries.py
+"""
+Shared retry policies for outbound calls: bounded exponential backoff with jitter,
+only on transient failures (429, 5xx, dropped connections). 4xx auth/quota errors
+are raised immediately.
+"""
+import anthropic
+import httpx
+from tenacity import retry, retry_if_exception, stop_after_attempt, wait_exponential_jitter
+from urllib3.util.retry import Retry
+
+# (connect, read) timeout per attempt, so each retry gets a fresh budget
+HTTP_TIMEOUT = (3.05, 10)
+
+RETRY_STATUSES = (429, 500, 502, 503, 504)
+
+
+def http_retry() -> Retry:
+    """
+    urllib3 policy to mount on a requests.Session via HTTPAdapter(max_retries=...).
+    """
+    return Retry(
+        total=3,
+        backoff_factor=0.3,
+        status_forcelist=list(RETRY_STATUSES),
+        allowed_methods=["GET"],
+        respect_retry_after_header=True,
+    )
+
+
+def _is_transient_status(status) -> bool:
+    return status is not None and (int(status) == 429 or int(status) >= 500)
+
+
+def _is_retryable_claude_error(exc: BaseException) -> bool:
+    if isinstance(exc, anthropic.APIStatusError):
+        return _is_transient_status(exc.status_code)
+    return isinstance(exc, anthropic.APIConnectionError)
+
+
+def _is_retryable_http_error(exc: BaseException) -> bool:
+    if isinstance(exc, httpx.HTTPStatusError):
+        return _is_transient_status(exc.response.status_code)
+    return isinstance(exc, httpx.TransportError)
+
+
+claude_retry = retry(
+    stop=stop_after_attempt(4),
+    wait=wait_exponential_jitter(initial=0.5, max=8),
+    retry=retry_if_exception(_is_retryable_claude_error),
+    reraise=True,
+)
+
+# Google CSE is called over httpx too, so the same transient-error test applies
+google_retry = retry(
+    stop=stop_after_attempt(3),
+    wait=wait_exponential_jitter(initial=0.5, max=4),
+    retry=retry_if_exception(_is_retryable_http_error),
+    reraise=True,
+)
+
+# For httpx page fetches (the async client has no urllib3-style status retries)
+page_retry = retry(
+    stop=stop_after_attempt(3),
+    wait=wait_exponential_jitter(initial=0.3, max=4),
+    retry=retry_if_exception(_is_retryable_http_error),
+    reraise=True,
+)
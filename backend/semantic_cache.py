@@ -0,0 +1,251 @@
+# semantic_cache.py
+"""
+Embedding-keyed answer cache for near-duplicate queries.
+
+"tallest mountains in the world" and "what are the world's highest mountains"
+should hit the same cached answer. Queries are embedded with a small local
+model and looked up in a persisted hnswlib index; rows live in SQLite next
+to the exact-match cache.
+
+Optional: needs `sentence-transformers` and `hnswlib` (requirements-semantic.txt).
+If either is missing, or the embedding model fails to load, the cache reports
+itself disabled and every lookup is a miss.
+"""
+import atexit
+import json
+import os
+import sqlite3
+import threading
+import time
+from typing import Dict, List, Optional, Tuple
+
+import llm_cache
+
+try:
+    import hnswlib
+    import numpy as np
+    from sentence_transformers import SentenceTransformer
+except ImportError:  # optional dependency
+    hnswlib = None
+    np = None
+    SentenceTransformer = None
+
+
+# =========================
+# Config
+# =========================
+EMBED_MODEL = os.getenv("SEMANTIC_CACHE_MODEL", "sentence-transformers/all-MiniLM-L6-v2")
+EMBED_DIM = 384
+THRESHOLD = float(os.getenv("SEMANTIC_CACHE_THRESHOLD", "0.92"))
+
+_DIR = os.path.dirname(llm_cache.CONFIG.path)
+DB_PATH = os.path.join(_DIR, "semantic_cache.db")
+INDEX_PATH = os.path.join(_DIR, "semantic_cache.hnsw")
+
+_INITIAL_CAPACITY = 1_000
+
+# Neighbours checked per lookup, so an expired nearest entry doesn't hide a live one
+SEARCH_K = 5
+
+# The index file is rewritten after this many inserts, and on exit
+SAVE_EVERY = 20
+
+# hnswlib and the sqlite connection are shared by all request threads
+_lock = threading.Lock()
+_index = None
+_db = None
+_unsaved = 0
+
+# The embedding model, or the error that stopped it loading (never retried)
+_load_lock = threading.Lock()
+_embedder = None
+_load_error: Optional[Exception] = None
+
+
+def enabled() -> bool:
+    return (
+        llm_cache.CONFIG.llm_cache_enabled
+        and SentenceTransformer is not None
+        and _load_error is None
+    )
+
+
+# =========================
+# Embedding
+# =========================
+def load() -> bool:
+    """
+    Load the embedding model (may download it); call once at startup. A failure is
+    remembered and disables the cache, so requests never retry the download.
+    """
+    global _embedder, _load_error
+    if not enabled():
+        return False
+    with _load_lock:
+        if _embedder is None and _load_error is None:
+            try:
+                _embedder = SentenceTransformer(EMBED_MODEL, device="cpu")
+            except Exception as e:
+                _load_error = e
+                print(f"Semantic cache disabled: could not load {EMBED_MODEL}: {e}")
+    return _embedder is not None
+
+
+def embed(texts: List[str]):
+    """
+    Return L2-normalized float32 embeddings, shape (len(texts), EMBED_DIM).
+    """
+    if not load():
+        raise RuntimeError("semantic cache embedder is unavailable")
+    return _embedder.encode(texts, normalize_embeddings=True, convert_to_numpy=True).astype(np.float32)
+
+
+# =========================
+# Storage
+# =========================
+def _open():
+    global _index, _db
+    if _index is not None:
+        return _index, _db
+
+    os.makedirs(_DIR, exist_ok=True)
+    db = sqlite3.connect(DB_PATH, timeout=5, check_same_thread=False)
+    db.execute("PRAGMA journal_mode=WAL")
+    db.execute(
+        "CREATE TABLE IF NOT EXISTS semantic ("
+        " id INTEGER PRIMARY KEY,"
+        " query TEXT NOT NULL,"
+        " answer TEXT NOT NULL,"
+        " sources TEXT NOT NULL,"
+        " created_at REAL NOT NULL,"
+        " model TEXT NOT NULL DEFAULT '',"
+        " k INTEGER NOT NULL DEFAULT 0)"
+    )
+    # Rows written before answers were keyed by model/k never match a lookup and age out
+    columns = {name for (_, name, *_) in db.execute("PRAGMA table_info(semantic)")}
+    with db:
+        if "model" not in columns:
+            db.execute("ALTER TABLE semantic ADD COLUMN model TEXT NOT NULL DEFAULT ''")
+        if "k" not in columns:
+            db.execute("ALTER TABLE semantic ADD COLUMN k INTEGER NOT NULL DEFAULT 0")
+
+    index = hnswlib.Index(space="cosine", dim=EMBED_DIM)
+    if os.path.exists(INDEX_PATH):
+        index.load_index(INDEX_PATH)
+    else:
+        index.init_index(max_elements=_INITIAL_CAPACITY, ef_construction=200, M=16)
+    index.set_ef(50)
+
+    # Reconcile the two stores: rows added after the last index save have no vector,
+    # and expired rows should stop being returned by knn_query
+    labels = {int(label) for label in index.get_ids_list()}
+    rows = {row_id for (row_id,) in db.execute("SELECT id FROM semantic")}
+    with db:
+        db.executemany("DELETE FROM semantic WHERE id = ?", [(i,) for i in rows - labels])
+    for label in labels - rows:
+        _mark_deleted(index, label)
+    _index, _db = index, db
+    _purge_expired(index, db)
+    return index, db
+
+
+def _mark_deleted(index, label: int) -> None:
+    try:
+        index.mark_deleted(label)
+    except RuntimeError:  # already deleted
+        pass
+
+
+def _purge_expired(index, db) -> None:
+    cutoff = time.time() - llm_cache.CONFIG.llm_ttl
+    expired = [row_id for (row_id,) in db.execute("SELECT id FROM semantic WHERE created_at < ?", (cutoff,))]
+    if not expired:
+        return
+    with db:
+        db.executemany("DELETE FROM semantic WHERE id = ?", [(i,) for i in expired])
+    for label in expired:
+        _mark_deleted(index, label)
+
+
+def lookup(query: str, model: str, k: int) -> Optional[Tuple[str, List[Dict[str, str]]]]:
+    """
+    Return (answer, sources) for the closest live cached query above THRESHOLD that was
+    answered by the same `model` from `k` sources, else None.
+    Expired neighbours met along the way are dropped from the index.
+    Cache errors are treated as a miss.
+    """
+    if not enabled():
+        return None
+    try:
+        emb = embed([query])
+        with _lock:
+            index, db = _open()
+            (live,) = db.execute("SELECT COUNT(*) FROM semantic").fetchone()
+            if live == 0:
+                return None
+            labels, dists = index.knn_query(emb, k=min(SEARCH_K, live))
+            cutoff = time.time() - llm_cache.CONFIG.llm_ttl
+            for label, dist in zip(labels[0], dists[0]):
+                if 1.0 - float(dist) < THRESHOLD:
+                    return None  # neighbours come nearest first
+                row = db.execute(
+                    "SELECT answer, sources, created_at, model, k FROM semantic WHERE id = ?",
+                    (int(label),),
+                ).fetchone()
+                if row and row[2] >= cutoff:
+                    if row[3] == model and row[4] == k:
+                        return row[0], json.loads(row[1])
+                    continue  # same question, different model or source count
+                with db:
+                    db.execute("DELETE FROM semantic WHERE id = ?", (int(label),))
+                _mark_deleted(index, int(label))
+    except Exception:
+        return None
+    return None
+
+
+def store(query: str, answer: str, sources: List[Dict[str, str]], model: str, k: int) -> None:
+    """
+    Insert a query/answer pair, tagged with the model and source count that produced it.
+    The index file is saved every SAVE_EVERY inserts and on exit. Cache errors never
+    break the caller.
+    """
+    global _unsaved
+    if not enabled():
+        return
+    try:
+        emb = embed([query])
+        with _lock:
+            index, db = _open()
+            with db:
+                cur = db.execute(
+                    "INSERT INTO semantic (query, answer, sources, created_at, model, k)"
+                    " VALUES (?, ?, ?, ?, ?, ?)",
+                    (query, answer, json.dumps(sources), time.time(), model, k),
+                )
+            if index.get_current_count() >= index.get_max_elements():
+                index.resize_index(index.get_max_elements() * 2)
+            index.add_items(emb, [cur.lastrowid])
+            _unsaved += 1
+            if _unsaved >= SAVE_EVERY:
+                _purge_expired(index, db)
+                index.save_index(INDEX_PATH)
+                _unsaved = 0
+    except Exception:
+        pass
+
+
+@atexit.register
+def flush() -> None:
+    """
+    Write pending index changes to disk.
+    """
+    global _unsaved
+    with _lock:
+        if _index is None or not _unsaved:
+            return
+        try:
+            _index.save_index(INDEX_PATH)
+            _unsaved = 0
+        except Exception:
+            pass
@@ -1,24 +1,49 @@
 # server.py
+import asyncio
 import os
-import textwrap
-from typing import List, Dict
+import re
+import unicodedata
+from contextlib import AsyncExitStack, asynccontextmanager
+from typing import AsyncIterator, Dict, Final, List, Tuple
 
 from fastapi import FastAPI, HTTPException
 from fastapi.middleware.cors import CORSMiddleware
+from fastapi.responses import ORJSONResponse, StreamingResponse
 from pydantic import BaseModel
+import orjson
 
 from dotenv import load_dotenv
 
 # Web + extraction
-import requests
+import httpx
 import trafilatura
 from bs4 import BeautifulSoup
-
-# Google Custom Search
-from googleapiclient.discovery import build
+from lxml import etree
+from trafilatura.xml import xmltotxt
 
 # Anthropic (Claude)
 import anthropic
+from anthropic.lib.streaming import AsyncMessageStream
+
+# Query-aware excerpt trimming + shared page-text helpers
+from compress import compress_excerpt
+from pages import (
+    MAX_HTML_BYTES,
+    TEXT_STRAINER,
+    check_content_length,
+    decode_html,
+    normalize_whitespace,
+)
+
+# Forced answer tool shared with the CLI
+from answer_tool import ANSWER_TOOL, ANSWER_TOOL_CHOICE, IncompleteAnswerError, answer_from_message
+
+# On-disk answer/page cache + near-duplicate query cache
+import llm_cache
+import semantic_cache
+
+# Backoff policies for Google / Claude / page fetches
+from retries import claude_retry, google_retry, page_retry
 
 
 # =========================
@@ -35,17 +60,28 @@ if not ANTHROPIC_API_KEY:
 if not (GSEARCH_API_KEY and SEARCH_ENGINE_ID):
     raise RuntimeError("GSEARCH_API_KEY or SEARCH_ENGINE_ID missing in .env")
 
-claude = anthropic.Anthropic(api_key=ANTHROPIC_API_KEY)
-
-# Persisted session with desktop UA (helps some sites serve real HTML)
-SESSION = requests.Session()
-SESSION.headers.update({
-    "User-Agent": (
-        "Mozilla/5.0 (Windows NT 10.0; Win64; x64) "
-        "AppleWebKit/537.36 (KHTML, like Gecko) "
-        "Chrome/120.0.0.0 Safari/537.36"
-    )
-})
+# Retries are handled by retries.claude_retry (with jitter), not the SDK
+claude = anthropic.AsyncAnthropic(api_key=ANTHROPIC_API_KEY, max_retries=0)
+
+# Haiku handles the guided summary well; Sonnet is opt-in via ?quality=high
+CLAUDE_MODEL      = os.getenv("CLAUDE_MODEL", "claude-3-5-haiku-latest")
+CLAUDE_MODEL_HIGH = os.getenv("CLAUDE_MODEL_HIGH", "claude-3-5-sonnet-latest")
+
+# Shared async client with desktop UA (helps some sites serve real HTML).
+# HTTP/2 multiplexes fetches to the same host over one keep-alive connection.
+HTTP = httpx.AsyncClient(
+    limits=httpx.Limits(max_connections=64, max_keepalive_connections=32),
+    timeout=httpx.Timeout(10.0, connect=3.0),
+    http2=True,
+    follow_redirects=True,
+    headers={
+        "User-Agent": (
+            "Mozilla/5.0 (Windows NT 10.0; Win64; x64) "
+            "AppleWebKit/537.36 (KHTML, like Gecko) "
+            "Chrome/120.0.0.0 Safari/537.36"
+        )
+    },
+)
 
 
 # =========================
@@ -65,15 +101,23 @@ class SearchResponse(BaseModel):
 # =========================
 # Search helpers
 # =========================
-AUTHORITATIVE_HINTS = [
+AUTHORITATIVE_HINTS: Final[Tuple[str, ...]] = (
     "site:wikipedia.org",
     "site:britannica.com",
     "site:new7wonders.com",
     "site:nationalgeographic.com",
     "site:unesco.org",
-]
+)
 
-WHITELIST_DOMAINS = (
+# Query variants tried by smart_search, most general first
+QUERY_TEMPLATES: Final[Tuple[str, ...]] = (
+    "{q}",
+    "{q} official list",
+    "{q} locations",
+    *(f"{{q}} {hint}" for hint in AUTHORITATIVE_HINTS),
+)
+
+WHITELIST_DOMAINS: Final[Tuple[str, ...]] = (
     "wikipedia.org",
     "britannica.com",
     "new7wonders.com",
@@ -81,36 +125,56 @@ WHITELIST_DOMAINS = (
     "unesco.org",
 )
 
+# One alternation scanned in a single pass instead of a substring check per domain
+_WHITELIST_RE = re.compile("|".join(re.escape(d) for d in WHITELIST_DOMAINS))
+
 
-def google_search_once(query: str, num_results: int = 10):
-    service = build("customsearch", "v1", developerKey=GSEARCH_API_KEY)
-    res = service.cse().list(q=query, cx=SEARCH_ENGINE_ID, num=min(num_results, 10)).execute()
-    return res.get("items", []) or []
+CSE_URL = "https://www.googleapis.com/customsearch/v1"
 
+# Query variants sent concurrently per round
+CSE_BATCH_SIZE = 4
 
-def smart_search(query: str, k: int = 8):
+
+@google_retry
+async def google_search_once(query: str, num_results: int = 10):
+    resp = await HTTP.get(CSE_URL, params={
+        "key": GSEARCH_API_KEY,
+        "cx": SEARCH_ENGINE_ID,
+        "q": query,
+        "num": min(num_results, 10),
+    })
+    resp.raise_for_status()
+    return resp.json().get("items", []) or []
+
+
+async def smart_search(query: str, k: int = 8):
     """
     Try multiple query variants and bias toward authoritative domains.
     Returns a de-duped list of result objects (title/link/snippet...).
     """
-    queries = [query, f"{query} official list", f"{query} locations"]
-    queries += [f"{query} {hint}" for hint in AUTHORITATIVE_HINTS]
+    queries = [t.format(q=query) for t in QUERY_TEMPLATES]
 
     seen = set()
     items = []
     budget = max(12, k * 2)
 
-    for q in queries:
-        results = google_search_once(q, 10)
-        for it in results:
-            link = it.get("link")
-            if not link or link in seen:
-                continue
-            seen.add(link)
-            items.append(it)
-            if len(items) >= budget:
+    # Fan out in small chunks so we can stop once an early chunk fills the budget
+    full = False
+    for start in range(0, len(queries), CSE_BATCH_SIZE):
+        chunk = queries[start:start + CSE_BATCH_SIZE]
+        for results in await asyncio.gather(*(google_search_once(q, 10) for q in chunk)):
+            for it in results:
+                link = it.get("link")
+                if not link or link in seen:
+                    continue
+                seen.add(link)
+                items.append(it)
+                full = len(items) >= budget
+                if full:
+                    break
+            if full:
                 break
-        if len(items) >= budget:
+        if full:
             break
 
     # light quality filter
@@ -121,140 +185,407 @@ def smart_search(query: str, k: int = 8):
 # =========================
 # Extraction
 # =========================
-def fetch_text(url: str, max_chars: int = 30_000) -> str:
+# Index/list pages (e.g. news front pages) extract as little more than their links
+MIN_LINKS_FOR_DENSITY_CHECK = 20
+MAX_LINK_TEXT_SHARE = 0.5
+
+
+def looks_like_link_list(body) -> bool:
+    """
+    True when most of the extracted text is link text. Only links trafilatura kept in
+    the main content count, so nav menus, interlanguage links and navboxes don't.
+    """
+    refs = body.findall(".//ref")
+    if len(refs) < MIN_LINKS_FOR_DENSITY_CHECK:
+        return False
+    link_chars = sum(len("".join(ref.itertext())) for ref in refs)
+    return link_chars > MAX_LINK_TEXT_SHARE * len("".join(body.itertext()))
+
+
+def extract_text(html: str, max_chars: int) -> str:
     """
     Extract readable text using trafilatura with fallback to BeautifulSoup.
+    CPU-bound; callers run it off the event loop.
     """
-    try:
-        # Try trafilatura's own fetch first (it sometimes handles redirects/enc better)
-        downloaded = trafilatura.fetch_url(url)
-        if downloaded:
-            text = trafilatura.extract(
-                downloaded,
-                include_comments=False,
-                include_tables=False,
-            )
-            if text and text.strip():
-                return text.strip()[:max_chars]
-
-        # Fallback: requests + BeautifulSoup minimal cleanup
-        resp = SESSION.get(url, timeout=15)
+    # Skip the passes we never use (images, metadata, language detection);
+    # fast=True (trafilatura 2.x) also skips the readability/jusText fallback cascade.
+    # Links are kept only to measure link density, then stripped below.
+    doc = trafilatura.bare_extraction(
+        html,
+        fast=True,
+        include_comments=False,
+        include_tables=False,
+        include_images=False,
+        include_links=True,
+        include_formatting=False,
+        deduplicate=False,
+        with_metadata=False,
+        target_language=None,
+    )
+    if doc is not None and doc.body is not None and not looks_like_link_list(doc.body):
+        # Same text extract(..., include_links=False) would return, without a second pass
+        etree.strip_tags(doc.body, "ref")
+        text = unicodedata.normalize("NFC", xmltotxt(doc.body, False)).strip()
+        if text:
+            return text[:max_chars]
+
+    # Fallback: BeautifulSoup minimal cleanup
+    soup = BeautifulSoup(html, "lxml", parse_only=TEXT_STRAINER)
+    # containers like <main>/<article> can still hold inline scripts
+    for tag in soup(["script", "style", "noscript", "iframe"]):
+        tag.decompose()
+    return normalize_whitespace(soup.get_text("\n"))[:max_chars]
+
+
+@page_retry
+async def fetch_html(url: str) -> str:
+    async with HTTP.stream("GET", url) as resp:
         resp.raise_for_status()
-        soup = BeautifulSoup(resp.text, "html.parser")
-        for tag in soup(["script", "style", "noscript", "iframe"]):
-            tag.decompose()
-        text = "\n".join(line.strip() for line in soup.get_text("\n").splitlines() if line.strip())
-        return text[:max_chars] if text else ""
+        check_content_length(resp.headers)
+
+        # aiter_bytes yields decompressed data, so a gzip bomb stops near the cap; each
+        # network chunk is inflated whole first, so one read can still overshoot it
+        buf = bytearray()
+        async for chunk in resp.aiter_bytes(chunk_size=16_384):
+            buf.extend(chunk)
+            if len(buf) >= MAX_HTML_BYTES:
+                break
+        return decode_html(buf, resp.encoding)
+
+
+async def fetch_text(url: str, max_chars: int = 30_000) -> str:
+    """
+    Download a page and return its readable text (trimmed).
+    """
+    # Keyed by extractor and length: the CLI shares this cache file but extracts differently
+    cache_key = llm_cache.make_key("page:server", url, str(max_chars))
+    cached = await asyncio.to_thread(llm_cache.get, cache_key)
+    if cached is not None:
+        return cached
+
+    try:
+        html = await fetch_html(url)
+        text = await asyncio.to_thread(extract_text, html, max_chars)
     except Exception as e:
         return f"[Fetch error for {url}: {e}]"
 
+    await asyncio.to_thread(llm_cache.set, cache_key, text, llm_cache.CONFIG.page_ttl)
+    return text
 
-def strong_sources(results, k: int = 6):
+
+async def fetch_many(links: List[str]) -> List[str]:
     """
-    Keep sources that are on trusted domains or have enough extracted content.
+    Fetch pages concurrently; results are returned in the same order as `links`.
     """
-    sources = []
-    for r in results:
-        link = r.get("link")
-        title = r.get("title") or "Untitled"
-        if not link:
-            continue
-        content = fetch_text(link)
-        is_whitelisted = any(d in (link or "") for d in WHITELIST_DOMAINS)
-        long_enough = content and len(content) >= 800  # rough cut-off for useful pages
-
-        if is_whitelisted or long_enough:
-            sources.append({"title": title, "link": link, "content": content})
-
-        if len(sources) >= k:
-            break
+    return list(await asyncio.gather(*(fetch_text(link) for link in links)))
 
-    return sources
+
+async def strong_sources(results, k: int = 6):
+    """
+    Keep sources that are on trusted domains or have enough extracted content.
+    Stops fetching as soon as `k` sources qualify; results keep their search rank order.
+    """
+    ranked = [
+        (rank, r.get("title") or "Untitled", r.get("link"))
+        for rank, r in enumerate(results) if r.get("link")
+    ]
+    trusted = [p for p in ranked if _WHITELIST_RE.search(p[2]) is not None]
+    others = [p for p in ranked if _WHITELIST_RE.search(p[2]) is None]
+
+    # Pass 1: whitelisted links always qualify, so fetch only as many as we need
+    trusted = trusted[:k]
+    contents = await fetch_many([link for _, _, link in trusted])
+    kept = [
+        (rank, {"title": title, "link": link, "content": content})
+        for (rank, title, link), content in zip(trusted, contents)
+    ]
+
+    # Pass 2: the rest must earn their place; take them as they finish, stop at k
+    if len(kept) < k and others:
+        async def _fetch(item):
+            return item, await fetch_text(item[2])
+
+        pending = [asyncio.create_task(_fetch(p)) for p in others]
+        try:
+            for next_done in asyncio.as_completed(pending):
+                (rank, title, link), content = await next_done
+                if content and len(content) >= 800:  # rough cut-off for useful pages
+                    kept.append((rank, {"title": title, "link": link, "content": content}))
+                    if len(kept) >= k:
+                        break
+        finally:
+            for task in pending:
+                task.cancel()
+            await asyncio.gather(*pending, return_exceptions=True)
+
+    kept.sort(key=lambda rs: rs[0])
+    return [source for _, source in kept]
 
 
 # =========================
 # LLM
 # =========================
-def summarize_with_claude(sources: List[Dict[str, str]], user_query: str) -> str:
+@claude_retry
+async def create_message(**kwargs):
+    return await claude.messages.create(**kwargs)
+
+
+@claude_retry
+async def open_stream(request: dict) -> Tuple[AsyncExitStack, AsyncMessageStream, str]:
     """
-    Ask Claude to answer using the provided sources, but allow succinct general-knowledge
-    answers for widely accepted facts. Still cite at least one reputable source when possible.
+    Open a Claude stream and read its first text chunk. Overload and connection errors
+    surface here, before anything reaches the client, so this is the part we can retry.
+    """
+    stack = AsyncExitStack()
+    try:
+        stream = await stack.enter_async_context(claude.messages.stream(**request))
+        try:
+            first = await stream.text_stream.__anext__()
+        except StopAsyncIteration:
+            first = ""
+    except BaseException:
+        await stack.aclose()
+        raise
+    return stack, stream, first
+
+
+# Per-source excerpt budget sent to Claude
+EXCERPT_TOKENS = 1500
+
+
+def build_context(sources: List[Dict[str, str]], user_query: str) -> str:
+    """
+    Numbered source blocks, each excerpt compressed to the sentences most relevant to the query.
     """
     context_blocks = []
     for i, s in enumerate(sources, start=1):
-        block = textwrap.dedent(f"""
-        [Source {i}]
-        Title: {s.get('title') or 'Untitled'}
-        URL: {s.get('link')}
-        Excerpt:
-        {(s.get('content') or '')[:6000]}
-        """).strip()
+        excerpt = compress_excerpt(s.get('content') or '', user_query, EXCERPT_TOKENS)
+        block = (
+            f"[Source {i}]\n"
+            f"Title: {s.get('title') or 'Untitled'}\n"
+            f"URL: {s.get('link')}\n"
+            f"Excerpt:\n{excerpt}"
+        )
         context_blocks.append(block)
 
-    context = "\n\n".join(context_blocks)
+    return "\n\n".join(context_blocks)
+
 
-    system_prompt = (
+# Static, so it is built once. No cache_control marker: the tools + system prefix is far
+# below Claude's minimum cacheable length, and the sources differ per query
+SYSTEM_PROMPT: Final[List[Dict]] = [{
+    "type": "text",
+    "text": (
         "You are a precise research assistant. Prefer answers grounded in the provided sources, "
         "with citations like [1], [2]. If the question concerns widely accepted general facts "
         "(e.g., capitals, well-known lists, definitions) and the provided sources are thin, you may "
         "answer succinctly using general knowledge, but still try to ground with at least one reputable "
         "source from those provided. If essential details truly aren’t in the sources and not reliable "
         "as general knowledge, say what is missing and suggest the single best next source to check."
-    )
+    ),
+}]
 
-    user_prompt = f"user_query: {user_query}\n\nSources:\n{context}"
 
-    msg = claude.messages.create(
-        model="claude-3-5-sonnet-latest",  # or "claude-3-5-haiku-latest"
+def claude_request(context: str, user_query: str, model: str = CLAUDE_MODEL) -> dict:
+    """
+    Keyword arguments shared by the blocking and streaming Claude calls.
+    """
+    # Static system prompt first, then the per-query sources, then the short query
+    return dict(
+        model=model,
         max_tokens=1400,
         temperature=0.2,
-        system=system_prompt,
-        messages=[{"role": "user", "content": user_prompt}],
+        system=SYSTEM_PROMPT,
+        messages=[{
+            "role": "user",
+            "content": [
+                {"type": "text", "text": f"Sources:\n{context}"},
+                {"type": "text", "text": f"user_query: {user_query}"},
+            ],
+        }],
     )
 
-    parts = []
-    for p in msg.content:
-        if getattr(p, "type", "") == "text":
-            parts.append(p.text)
-    return "".join(parts).strip()
+
+def answer_cache_key(request: dict) -> str:
+    # Model, prompts and sampling settings all feed the key
+    return llm_cache.make_key(orjson.dumps(request, option=orjson.OPT_SORT_KEYS).decode())
+
+
+async def summarize_with_claude(
+    sources: List[Dict[str, str]], user_query: str, model: str = CLAUDE_MODEL
+) -> str:
+    """
+    Ask Claude to answer using the provided sources, but allow succinct general-knowledge
+    answers for widely accepted facts. Still cite at least one reputable source when possible.
+    """
+    # TF-IDF scoring is CPU work; keep it off the event loop
+    context = await asyncio.to_thread(build_context, sources, user_query)
+    request = claude_request(context, user_query, model)
+    request.update(tools=[ANSWER_TOOL], tool_choice=ANSWER_TOOL_CHOICE)
+
+    cache_key = answer_cache_key(request)
+    cached = await asyncio.to_thread(llm_cache.get, cache_key)
+    if cached is not None:
+        return cached
+
+    msg = await create_message(**request)
+
+    # Raises on a truncated/empty answer, so only complete answers are cached
+    answer = answer_from_message(msg)
+
+    await asyncio.to_thread(llm_cache.set, cache_key, answer, llm_cache.CONFIG.llm_ttl)
+    return answer
 
 
-def agentic_search(query: str, k: int = 6):
+async def stream_summary(
+    sources: List[Dict[str, str]], user_query: str, model: str = CLAUDE_MODEL
+) -> AsyncIterator[str]:
+    """
+    Same as summarize_with_claude, but yields text as Claude generates it.
+    Plain text rather than the answer tool, since tool input streams as partial JSON.
+    A cached answer is yielded in one piece.
+    """
+    context = await asyncio.to_thread(build_context, sources, user_query)
+    request = claude_request(context, user_query, model)
+
+    cache_key = answer_cache_key(request)
+    cached = await asyncio.to_thread(llm_cache.get, cache_key)
+    if cached is not None:
+        yield cached
+        return
+
+    # Only the open is retried: text already sent to the client can't be taken back
+    stack, stream, first = await open_stream(request)
+    parts = [first]
+    async with stack:
+        if first:
+            yield first
+        async for text in stream.text_stream:
+            parts.append(text)
+            yield text
+        final = await stream.get_final_message()
+
+    # Don't cache (or let the caller store) an answer that was cut off or empty
+    answer = "".join(parts).strip()
+    if final.stop_reason != "end_turn":
+        raise IncompleteAnswerError(f"Claude stopped early (stop_reason={final.stop_reason})")
+    if not answer:
+        raise IncompleteAnswerError("Claude returned an empty answer")
+
+    await asyncio.to_thread(llm_cache.set, cache_key, answer, llm_cache.CONFIG.llm_ttl)
+
+
+async def gather_sources(query: str, k: int = 6) -> List[Dict[str, str]]:
     # 1) broader + biased search
-    results = smart_search(query, k=max(10, k * 2))
+    results = await smart_search(query, k=max(10, k * 2))
     if not results:
         raise HTTPException(status_code=400, detail="No search results. Check Google CSE settings.")
 
     # 2) filter/strengthen
-    sources = strong_sources(results, k=k)
+    sources = await strong_sources(results, k=k)
     if not sources:  # final fallback: use top few raw
+        top = results[:k]
+        contents = await fetch_many([r.get("link") for r in top])
         sources = [{
             "title": r.get("title", "Untitled"),
             "link": r.get("link"),
-            "content": fetch_text(r.get("link"))
-        } for r in results[:k]]
+            "content": content
+        } for r, content in zip(top, contents)]
+    return sources
+
+
+def slim(sources: List[Dict[str, str]]) -> List[Dict[str, str]]:
+    return [{"title": s["title"], "link": s["link"]} for s in sources]
+
+
+async def agentic_search(query: str, k: int = 6, model: str = CLAUDE_MODEL):
+    # 0) paraphrase of a recent query? reuse its answer (embedding is CPU, keep it off the loop)
+    hit = await asyncio.to_thread(semantic_cache.lookup, query, model, k)
+    if hit:
+        return hit
+
+    sources = await gather_sources(query, k)
 
     # 3) summarize
-    answer = summarize_with_claude(sources, query)
+    answer = await summarize_with_claude(sources, query, model)
 
     # return slim sources to client
-    return answer, [{"title": s["title"], "link": s["link"]} for s in sources]
+    slim_sources = slim(sources)
+    await asyncio.to_thread(semantic_cache.store, query, answer, slim_sources, model, k)
+    return answer, slim_sources
+
+
+# =========================
+# Streaming (Server-Sent Events)
+# =========================
+def sse(event: str, data) -> bytes:
+    return b"event: " + event.encode() + b"\ndata: " + orjson.dumps(data) + b"\n\n"
+
+
+async def replay_events(query: str, answer: str, slim_sources: List[Dict[str, str]]) -> AsyncIterator[bytes]:
+    yield sse("sources", slim_sources)
+    yield sse("token", answer)
+    yield sse("done", {"query": query})
+
+
+async def answer_events(
+    query: str, sources: List[Dict[str, str]], model: str = CLAUDE_MODEL, k: int = 6
+) -> AsyncIterator[bytes]:
+    """
+    Events: `sources` (list of {title, link}), then one `token` per text chunk, then `done`.
+    Failures after the response has started are reported as an `error` event.
+    """
+    slim_sources = slim(sources)
+    yield sse("sources", slim_sources)
+
+    parts = []
+    try:
+        async for text in stream_summary(sources, query, model):
+            parts.append(text)
+            yield sse("token", text)
+    except anthropic.APIStatusError as e:
+        yield sse("error", f"Claude error: {e}")
+        return
+    except Exception as e:
+        yield sse("error", str(e))
+        return
+
+    await asyncio.to_thread(semantic_cache.store, query, "".join(parts).strip(), slim_sources, model, k)
+    yield sse("done", {"query": query})
 
 
 # =========================
 # FastAPI app
 # =========================
-app = FastAPI(title="Agentic Search API (Claude)")
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    # Load the embedding model now rather than inside the first /search request
+    await asyncio.to_thread(semantic_cache.load)
+    yield
+    await HTTP.aclose()
+    await claude.close()
+    # Persist semantic-cache inserts made since the last periodic save
+    await asyncio.to_thread(semantic_cache.flush)
+
+
+# orjson serializes the (long) answer + source list much faster than stdlib json
+app = FastAPI(
+    title="Agentic Search API (Claude)",
+    default_response_class=ORJSONResponse,
+    lifespan=lifespan,
+)
 
 # CORS for your Vite dev server(s)
+ALLOWED_ORIGINS: Final[Tuple[str, ...]] = (
+    "http://localhost:5173",
+    "http://127.0.0.1:5173",
+    "http://localhost:5174",
+    "http://127.0.0.1:5174",
+)
+
 app.add_middleware(
     CORSMiddleware,
-    allow_origins=[
-        "http://localhost:5173",
-        "http://127.0.0.1:5173",
-        "http://localhost:5174",
-        "http://127.0.0.1:5174",
-    ],
+    allow_origins=ALLOWED_ORIGINS,
     allow_credentials=True,
     allow_methods=["*"],
     allow_headers=["*"],
@@ -266,13 +597,37 @@ def health():
     return {"ok": True}
 
 
-@app.post("/search", response_model=SearchResponse)
-def search(req: SearchRequest):
+# No response_model: the JSON body is built from our own data, so skip re-validating it.
+# SearchResponse is kept as the documented schema of the ?stream=false body.
+@app.post("/search", response_model=None, responses={200: {"model": SearchResponse}})
+async def search(req: SearchRequest, stream: bool = True, quality: str = "standard"):
+    """
+    Streams the answer as Server-Sent Events by default; `?stream=false` returns one JSON body.
+    `?quality=high` answers with CLAUDE_MODEL_HIGH instead of CLAUDE_MODEL.
+    """
+    model = CLAUDE_MODEL_HIGH if quality == "high" else CLAUDE_MODEL
     try:
-        answer, slim_sources = agentic_search(req.query, k=req.k)
-        return SearchResponse(query=req.query, answer=answer, sources=slim_sources)
+        if not stream:
+            answer, slim_sources = await agentic_search(req.query, k=req.k, model=model)
+            return ORJSONResponse({"query": req.query, "answer": answer, "sources": slim_sources})
+
+        # Search + fetch happen before the stream opens so their errors keep proper status codes
+        hit = await asyncio.to_thread(semantic_cache.lookup, req.query, model, req.k)
+        if hit:
+            events = replay_events(req.query, *hit)
+        else:
+            events = answer_events(req.query, await gather_sources(req.query, k=req.k), model, req.k)
+        return StreamingResponse(
+            events,
+            media_type="text/event-stream",
+            headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"},
+        )
     except anthropic.APIStatusError as e:
         # Claude-side failure
         raise HTTPException(status_code=502, detail=f"Claude error: {e}") from e
+    except IncompleteAnswerError as e:
+        raise HTTPException(status_code=502, detail=str(e)) from e
+    except HTTPException:
+        raise
     except Exception as e:
         raise HTTPException(status_code=500, detail=str(e)) from e
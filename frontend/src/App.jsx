@@ -70,14 +70,45 @@ export default function App() {
         body: JSON.stringify({ query, k }),
       });
 
-      const raw = await res.text();
       console.log("API_BASE:", API_BASE);
-      console.log("HTTP", res.status, raw);
-
-      if (!res.ok) throw new Error(raw || `HTTP ${res.status}`);
-
-      const json = JSON.parse(raw);
-      setData(json);
+      console.log("HTTP", res.status);
+
+      if (!res.ok) {
+        const raw = await res.text();
+        throw new Error(raw || `HTTP ${res.status}`);
+      }
+
+      // Server-Sent Events: `sources`, then `token` chunks, then `done` (or `error`)
+      setData({ query, answer: "", sources: [] });
+      const reader = res.body.getReader();
+      const decoder = new TextDecoder();
+      let buf = "";
+
+      const handleEvent = (raw) => {
+        let event = "message";
+        let payload = "";
+        for (const line of raw.split("\n")) {
+          if (line.startsWith("event: ")) event = line.slice(7);
+          else if (line.startsWith("data: ")) payload += line.slice(6);
+        }
+        const value = payload ? JSON.parse(payload) : null;
+
+        if (event === "sources") setData((d) => ({ ...d, sources: value }));
+        else if (event === "token") setData((d) => ({ ...d, answer: d.answer + value }));
+        else if (event === "error") throw new Error(value);
+      };
+
+      for (;;) {
+        const { value, done } = await reader.read();
+        if (done) break;
+        buf += decoder.decode(value, { stream: true });
+
+        let idx;
+        while ((idx = buf.indexOf("\n\n")) !== -1) {
+          handleEvent(buf.slice(0, idx));
+          buf = buf.slice(idx + 2);
+        }
+      }
     } catch (err) {
       setError(err.message || "Request failed");
     } finally {
@@ -153,7 +184,9 @@ export default function App() {
             <div className="answer">
               {data?.answer?.trim()
                 ? data.answer
-                : <pre style={{ whiteSpace: "pre-wrap" }}>{JSON.stringify(data, null, 2)}</pre>}
+                : loading
+                  ? "…"
+                  : <pre style={{ whiteSpace: "pre-wrap" }}>{JSON.stringify(data, null, 2)}</pre>}
             </div>
 
             <h2 className="section-title">📚 Sources</h2>